@@ -14,10 +14,20 @@ MONGODB_URI = os.environ.get(
 DATABASE_NAME = 'imagedb'
 COLLECTION_NAME = 'image_data'
 
+# Wire compression, in order of preference (zstd needs the zstandard package)
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib')
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '4'))
+
+# Number of write operations sent per bulk_write call
+MONGO_BATCH_SIZE = int(os.environ.get('MONGO_BATCH_SIZE', '5000'))
+
 # API configuration
 API_HOST = os.environ.get('API_HOST', '0.0.0.0')
 API_PORT = int(os.environ.get('API_PORT', '8000'))
 
+# Data processing configuration
+CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', '100000'))
+
 # Image processing configuration
 DEFAULT_COLORMAP = 'grayscale'
 
@@ -30,9 +40,15 @@ COLORMAPS: Dict[str, str] = {
 }
 
 # Performance settings
-MAX_CONCURRENT_REQUESTS = 10
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', '10'))
 RESPONSE_TIMEOUT_SECONDS = 2
 
+# Number of rendered image frames kept in the in-process cache
+IMAGE_CACHE_SIZE = int(os.environ.get('IMAGE_CACHE_SIZE', '256'))
+
+# Seconds an image frame is reused: the in-process cache TTL and the Cache-Control max-age
+IMAGE_CACHE_MAX_AGE = int(os.environ.get('IMAGE_CACHE_MAX_AGE', '300'))
+
 # Data validation
 MAX_DEPTH_VALUE = 1e6
 MIN_DEPTH_VALUE = -1e6
@@ -3,25 +3,126 @@ Main script to process CSV data and populate the database.
 """
 import argparse
 import logging
+import queue
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from src.data_processing import read_csv, resize_data
-from src.database import init_db, insert_data, clear_database
+from src.data_processing import read_csv_chunks, resize_data
+from src.database import init_db, insert_data
 from src.utils import setup_logging, validate_csv_structure
 
+logger = logging.getLogger(__name__)
 
-def main(csv_path: str, clear_db: bool = False):
+# Marks the end of the stream in a pipeline queue
+_DONE = object()
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put an item on a queue, giving up if the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Get an item from a queue, returning _DONE if the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(csv_path: str, fast_insert: bool = True) -> int:
+    """
+    Read, resize and insert CSV chunks concurrently.
+    
+    Each stage runs in its own thread and hands chunks to the next through a
+    small bounded queue, so parsing, resizing and database writes overlap.
+    pandas parsing, numpy and pymongo release the GIL for most of their work.
+    If any stage fails the others stop and the error is re-raised.
+    
+    Args:
+        csv_path: Path to the CSV file
+        fast_insert: Whether to use unacknowledged writes
+        
+    Returns:
+        Number of rows processed
+    """
+    raw_chunks: queue.Queue = queue.Queue(maxsize=2)
+    resized_chunks: queue.Queue = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    
+    def read_stage():
+        try:
+            for chunk in read_csv_chunks(csv_path):
+                validate_csv_structure(chunk)
+                if not _put(raw_chunks, chunk, stop):
+                    break
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            _put(raw_chunks, _DONE, stop)
+    
+    def resize_stage():
+        try:
+            while True:
+                chunk = _get(raw_chunks, stop)
+                if chunk is _DONE or not _put(resized_chunks, resize_data(chunk), stop):
+                    break
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            _put(resized_chunks, _DONE, stop)
+    
+    def insert_stage() -> int:
+        total_rows = 0
+        try:
+            while True:
+                resized_df = _get(resized_chunks, stop)
+                if resized_df is _DONE:
+                    break
+                insert_data(resized_df, fast_insert=fast_insert)
+                total_rows += len(resized_df)
+                logger.info(f"Processed {total_rows} rows")
+        except BaseException:
+            stop.set()
+            raise
+        return total_rows
+    
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(read_stage),
+            executor.submit(resize_stage),
+            executor.submit(insert_stage)
+        ]
+    
+    # Re-raise any stage failure, otherwise return the insert stage row count
+    for future in futures:
+        future.result()
+    return futures[-1].result()
+
+
+def main(csv_path: str, clear_db: bool = False, safe_insert: bool = False):
     """
     Main function to process CSV and populate database.
     
     Args:
         csv_path: Path to the CSV file
         clear_db: Whether to clear existing data before inserting
+        safe_insert: Whether to wait for the database to acknowledge each write batch
     """
     # Set up logging
     setup_logging("INFO")
-    logger = logging.getLogger(__name__)
     
     try:
         # Check if file exists
@@ -34,29 +135,10 @@ def main(csv_path: str, clear_db: bool = False):
         # Force recreate if clearing database to ensure schema changes
         init_db(force_recreate=clear_db)
         
-        # Clear database if requested
-        if clear_db:
-            logger.info("Clearing existing data...")
-            # Database was already recreated, so no need to clear
-        
-        # Read CSV file
+        # Stream the CSV in chunks, overlapping parsing, resizing and inserts
         logger.info(f"Reading CSV file: {csv_path}")
-        df = read_csv(csv_path)
-        logger.info(f"Loaded {len(df)} rows of data")
-        
-        # Validate CSV structure
-        logger.info("Validating CSV structure...")
-        validate_csv_structure(df)
-        
-        # Resize data
-        logger.info("Resizing data from 200 to 150 columns...")
-        resized_df = resize_data(df)
-        logger.info("Data resizing complete")
-        
-        # Insert into database
-        logger.info("Inserting data into database...")
-        insert_data(resized_df)
-        logger.info("Data insertion complete")
+        total_rows = run_pipeline(csv_path, fast_insert=not safe_insert)
+        logger.info(f"Loaded {total_rows} rows of data")
         
         logger.info("Processing complete!")
         
@@ -78,7 +160,12 @@ if __name__ == "__main__":
         action="store_true",
         help="Clear existing database data before inserting"
     )
+    parser.add_argument(
+        "--safe-insert",
+        action="store_true",
+        help="Wait for the database to acknowledge each write batch"
+    )
     
     args = parser.parse_args()
     
-    main(args.csv_path, args.clear_db) 
\ No newline at end of file
+    main(args.csv_path, args.clear_db, args.safe_insert) 
\ No newline at end of file
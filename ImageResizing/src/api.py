@@ -2,23 +2,39 @@
 FastAPI application for serving image frames based on depth ranges.
 """
 from fastapi import FastAPI, Query, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Tuple
 import logging
+import threading
+import time
 
-from src.database import query_data
-from src.image_generation import generate_image, get_image_bytes
+import anyio
+
+from src.database import ensure_indexes, query_data
+from src.image_generation import render_frame, encode_png
 from config import (
     API_HOST, API_PORT, MIN_DEPTH_VALUE, MAX_DEPTH_VALUE,
-    MAX_CONCURRENT_REQUESTS, DEFAULT_COLORMAP, COLORMAPS
+    MAX_CONCURRENT_REQUESTS, DEFAULT_COLORMAP, COLORMAPS, IMAGE_CACHE_SIZE,
+    IMAGE_CACHE_MAX_AGE
 )
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Request validation, built once at import instead of per request
+ALLOWED_COLORMAPS = frozenset(COLORMAPS)
+INVALID_RANGE_DETAIL = "Invalid depth range"
+OUT_OF_BOUNDS_DETAIL = f"Depth values must be between {MIN_DEPTH_VALUE} and {MAX_DEPTH_VALUE}"
+INVALID_COLORMAP_DETAIL = f"Invalid colormap. Available options: {list(COLORMAPS.keys())}"
+
+# Rendered frames keyed by (depth_min, depth_max, colormap), stored as
+# (expires_at, png_bytes) in least-recently-used order
+_frame_cache: "OrderedDict[Tuple[float, float, str], Tuple[float, bytes]]" = OrderedDict()
+_frame_cache_lock = threading.Lock()
+
 # Pydantic models for API documentation
 class HealthResponse(BaseModel):
     """Health check response model."""
@@ -79,13 +95,27 @@ app = FastAPI(
     ]
 )
 
-# Thread pool for handling concurrent requests
-executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+
+@app.on_event("startup")
+async def configure_threadpool():
+    """Size the threadpool that runs blocking endpoints."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = MAX_CONCURRENT_REQUESTS
+
+
+@app.on_event("startup")
+def connect_database():
+    """Connect to MongoDB and make sure the depth index queries rely on exists."""
+    try:
+        ensure_indexes()
+    except Exception as e:
+        # Keep serving; requests will retry the connection and report errors
+        logger.warning(f"Could not connect to database at startup: {e}")
 
 
 @app.get(
     "/",
     response_model=RootResponse,
+    response_class=ORJSONResponse,
     tags=["health"],
     summary="Root endpoint",
     description="Returns basic API information and version."
@@ -98,6 +128,7 @@ async def root():
 @app.get(
     "/health",
     response_model=HealthResponse,
+    response_class=ORJSONResponse,
     tags=["health"],
     summary="Health check",
     description="Endpoint for checking API health status.",
@@ -117,6 +148,94 @@ async def health():
     return {"status": "healthy"}
 
 
+def clear_image_cache():
+    """Drop every cached frame, e.g. after new data has been loaded."""
+    with _frame_cache_lock:
+        _frame_cache.clear()
+
+
+def render_image_frame(depth_min: float, depth_max: float, colormap: str) -> bytes:
+    """
+    Get PNG bytes for a depth range, from the frame cache when possible.
+    
+    Frames are cached by (depth_min, depth_max, colormap) for IMAGE_CACHE_MAX_AGE
+    seconds, keeping at most IMAGE_CACHE_SIZE of them, so repeated frames skip the
+    database query and image encoding. Errors are raised, and therefore not cached.
+    
+    Args:
+        depth_min: Minimum depth value
+        depth_max: Maximum depth value
+        colormap: Color map to apply
+        
+    Returns:
+        PNG image as bytes
+    """
+    key = (depth_min, depth_max, colormap)
+    now = time.monotonic()
+    with _frame_cache_lock:
+        entry = _frame_cache.get(key)
+        if entry is not None:
+            expires_at, image_bytes = entry
+            if expires_at > now:
+                _frame_cache.move_to_end(key)
+                return image_bytes
+            del _frame_cache[key]
+    
+    # Render outside the lock so slow frames do not block cache hits
+    image_bytes = _render_png(depth_min, depth_max, colormap)
+    
+    with _frame_cache_lock:
+        _frame_cache[key] = (now + IMAGE_CACHE_MAX_AGE, image_bytes)
+        _frame_cache.move_to_end(key)
+        while len(_frame_cache) > IMAGE_CACHE_SIZE:
+            _frame_cache.popitem(last=False)
+    
+    return image_bytes
+
+
+def _render_png(depth_min: float, depth_max: float, colormap: str) -> bytes:
+    """
+    Query a depth range and render it as PNG bytes.
+    
+    Args:
+        depth_min: Minimum depth value
+        depth_max: Maximum depth value
+        colormap: Color map to apply
+        
+    Returns:
+        PNG image as bytes
+    """
+    # Query database
+    try:
+        data_records = query_data(depth_min, depth_max)
+    except Exception as e:
+        logger.error(f"Database query error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Database query failed"
+        )
+    
+    # Check if data exists
+    if not data_records:
+        raise HTTPException(
+            status_code=404,
+            detail="No data in specified depth range"
+        )
+    
+    # Generate image
+    try:
+        rgb_data = render_frame(data_records, colormap)
+        image_bytes = encode_png(rgb_data)
+    except Exception as e:
+        logger.error(f"Image generation error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Image generation failed"
+        )
+    
+    return image_bytes
+
+
 @app.get(
     "/image_frame",
     response_class=Response,
@@ -136,6 +255,7 @@ async def health():
     **Returns:**
     - PNG image as binary data
     - Content-Disposition header with suggested filename
+    - Cache-Control header so clients and proxies can reuse the frame
     """,
     responses={
         200: {
@@ -149,6 +269,10 @@ async def health():
                 "Content-Disposition": {
                     "description": "Suggested filename for the image",
                     "schema": {"type": "string"}
+                },
+                "Cache-Control": {
+                    "description": "How long clients and proxies may cache the image",
+                    "schema": {"type": "string"}
                 }
             }
         },
@@ -160,15 +284,15 @@ async def health():
                     "examples": {
                         "invalid_range": {
                             "summary": "Invalid depth range",
-                            "value": {"detail": "Invalid depth range"}
+                            "value": {"detail": INVALID_RANGE_DETAIL}
                         },
                         "out_of_bounds": {
                             "summary": "Depth values out of bounds",
-                            "value": {"detail": f"Depth values must be between {MIN_DEPTH_VALUE} and {MAX_DEPTH_VALUE}"}
+                            "value": {"detail": OUT_OF_BOUNDS_DETAIL}
                         },
                         "invalid_colormap": {
                             "summary": "Invalid colormap",
-                            "value": {"detail": f"Invalid colormap. Available options: {list(COLORMAPS.keys())}"}
+                            "value": {"detail": INVALID_COLORMAP_DETAIL}
                         }
                     }
                 }
@@ -203,7 +327,7 @@ async def health():
         }
     }
 )
-async def get_image_frame(
+def get_image_frame(
     depth_min: float = Query(..., description="Minimum depth value for filtering data", example=0.0),
     depth_max: float = Query(..., description="Maximum depth value for filtering data", example=100.0),
     colormap: Optional[str] = Query(DEFAULT_COLORMAP, description="Color map to apply to the generated image", example=DEFAULT_COLORMAP)
@@ -219,78 +343,30 @@ async def get_image_frame(
     Returns:
         PNG image as binary response
     """
-    # Validate depth range
-    if depth_min > depth_max:
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid depth range"
-        )
-    
-    # Validate depth values are within bounds
-    if depth_min < MIN_DEPTH_VALUE or depth_max > MAX_DEPTH_VALUE:
+    # Validate depth range and bounds in one chained comparison; only a
+    # failing request works out which check it broke
+    if not MIN_DEPTH_VALUE <= depth_min <= depth_max <= MAX_DEPTH_VALUE:
         raise HTTPException(
             status_code=400,
-            detail=f"Depth values must be between {MIN_DEPTH_VALUE} and {MAX_DEPTH_VALUE}"
+            detail=INVALID_RANGE_DETAIL if depth_min > depth_max else OUT_OF_BOUNDS_DETAIL
         )
     
     # Validate colormap
-    if colormap not in COLORMAPS:
+    if colormap not in ALLOWED_COLORMAPS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid colormap. Available options: {list(COLORMAPS.keys())}"
-        )
-    
-    # Run database query in thread pool to avoid blocking
-    loop = asyncio.get_event_loop()
-    try:
-        data_records = await loop.run_in_executor(
-            executor,
-            query_data,
-            depth_min,
-            depth_max
-        )
-    except Exception as e:
-        logger.error(f"Database query error: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail="Database query failed"
-        )
-    
-    # Check if data exists
-    if not data_records:
-        raise HTTPException(
-            status_code=404,
-            detail="No data in specified depth range"
+            detail=INVALID_COLORMAP_DETAIL
         )
     
-    # Generate image in thread pool
-    try:
-        image = await loop.run_in_executor(
-            executor,
-            generate_image,
-            data_records,
-            colormap
-        )
-        
-        image_bytes = await loop.run_in_executor(
-            executor,
-            get_image_bytes,
-            image
-        )
-        
-    except Exception as e:
-        logger.error(f"Image generation error: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail="Image generation failed"
-        )
+    image_bytes = render_image_frame(depth_min, depth_max, colormap)
     
     # Return image as PNG response
     return Response(
         content=image_bytes,
         media_type="image/png",
         headers={
-            "Content-Disposition": f"inline; filename=depth_{depth_min}_{depth_max}.png"
+            "Content-Disposition": f"inline; filename=depth_{depth_min}_{depth_max}.png",
+            "Cache-Control": f"public, max-age={IMAGE_CACHE_MAX_AGE}"
         }
     )
 
@@ -3,28 +3,149 @@ Data processing module for reading CSV and resizing image data.
 """
 import pandas as pd
 import numpy as np
-from typing import List, Tuple
+from typing import IO, Dict, Iterator, Tuple, Union
 
+from config import CSV_CHUNK_SIZE
+from src.utils import PIXEL_COLUMNS, RESIZED_COLUMNS, find_missing_pixel_columns
+from src.data_processing_numba import NUMBA_AVAILABLE
 
-def read_csv(file_path: str) -> pd.DataFrame:
+if NUMBA_AVAILABLE:
+    from src.data_processing_numba import resize_block
+
+# Interpolation weights keyed by (original_width, new_width)
+_interpolation_weights: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+# Explicit CSV schema so pandas skips type inference; pixel intensities fit in float32
+# Depth stays float64 since it is the unique key records are stored under
+CSV_DTYPES = {'depth': 'float64', **{col: 'float32' for col in PIXEL_COLUMNS}}
+
+
+def _is_schema_column(column: str) -> bool:
+    """Column filter for usecols that tolerates schema columns missing from the file."""
+    return column in CSV_DTYPES
+
+
+def read_csv(path_or_buf: Union[str, IO[str]]) -> pd.DataFrame:
     """
     Read CSV file containing depth and pixel intensity data.
     
     Args:
-        file_path: Path to the CSV file
+        path_or_buf: Path to the CSV file, or an open text buffer such as StringIO
         
     Returns:
         DataFrame with depth and pixel columns
     """
-    df = pd.read_csv(file_path)
+    # Only parse the schema columns; stray columns are skipped by the C parser
+    df = pd.read_csv(path_or_buf, engine='c', dtype=CSV_DTYPES, usecols=_is_schema_column)
     # Ensure depth column exists and data is sorted by depth
     if 'depth' not in df.columns:
         raise ValueError("CSV must contain a 'depth' column")
     
-    df = df.sort_values('depth').reset_index(drop=True)
+    return sort_by_depth(df)
+
+
+def sort_by_depth(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sort a DataFrame by its depth column.
+    
+    Uses one stable argsort and a single gather per column instead of the
+    sort_values machinery. Equal depths keep file order and NaN sorts last.
+    
+    Args:
+        df: DataFrame with a depth column
+        
+    Returns:
+        Sorted DataFrame with a fresh 0..n-1 index
+    """
+    order = np.argsort(df['depth'].to_numpy(), kind='stable')
+    df = df.take(order)
+    df.reset_index(drop=True, inplace=True)
     return df
 
 
+def read_csv_chunks(path_or_buf: Union[str, IO[str]], chunksize: int = CSV_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file containing depth and pixel intensity data in chunks.
+    
+    Keeps peak memory bounded for large files. Chunks keep file order and are
+    not sorted by depth; records are keyed by depth when stored, so this is
+    safe for ingestion.
+    
+    Args:
+        path_or_buf: Path to the CSV file, or an open text buffer
+        chunksize: Number of rows per chunk
+        
+    Yields:
+        DataFrames with depth and pixel columns
+    """
+    with pd.read_csv(
+        path_or_buf, engine='c', dtype=CSV_DTYPES, usecols=_is_schema_column, chunksize=chunksize
+    ) as reader:
+        for chunk in reader:
+            if 'depth' not in chunk.columns:
+                raise ValueError("CSV must contain a 'depth' column")
+            yield chunk
+
+
+def get_interpolation_weights(
+    original_width: int = 200, new_width: int = 150
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the source pixel indices and weights for linear interpolation.
+    
+    Output pixel j is pixel[lower[j]] * (1 - weights[j]) + pixel[upper[j]] * weights[j].
+    
+    Args:
+        original_width: Original number of pixels
+        new_width: Target number of pixels
+        
+    Returns:
+        Tuple of (lower, upper, weights) arrays of length new_width
+    """
+    key = (original_width, new_width)
+    cached = _interpolation_weights.get(key)
+    if cached is None:
+        positions = np.linspace(0, original_width - 1, new_width)
+        lower = positions.astype(np.int64)
+        upper = np.minimum(lower + 1, original_width - 1)
+        weights = (positions - lower).astype(np.float32)
+        cached = _interpolation_weights[key] = (lower, upper, weights)
+    return cached
+
+
+def resize_rows(pixels: np.ndarray, original_width: int = 200, new_width: int = 150) -> np.ndarray:
+    """
+    Resize a 2D block of pixel rows using linear interpolation.
+    
+    Uses a parallel numba kernel when numba is installed, otherwise the same
+    two-tap blend as NumPy gathers. Each output reads only its two neighbouring
+    source pixels, so a NaN pixel only affects the outputs next to it.
+    
+    Args:
+        pixels: Array of shape (rows, original_width)
+        original_width: Original number of pixels
+        new_width: Target number of pixels
+        
+    Returns:
+        Float32 array of shape (rows, new_width)
+    """
+    pixels = np.ascontiguousarray(pixels, dtype=np.float32)
+    # The numba kernel does not bounds-check, so reject rows of the wrong width
+    if pixels.ndim != 2 or pixels.shape[1] != original_width:
+        raise ValueError(
+            f"Expected pixel rows of width {original_width}, got array of shape {pixels.shape}"
+        )
+    lower, upper, weights = get_interpolation_weights(original_width, new_width)
+    out = np.empty((pixels.shape[0], new_width), dtype=np.float32)
+    if NUMBA_AVAILABLE:
+        resize_block(pixels, lower, upper, weights, out)
+    else:
+        # pixel[lower] * (1 - weight) + pixel[upper] * weight, straight into out
+        np.multiply(pixels[:, lower], 1 - weights, out=out)
+        out += pixels[:, upper] * weights
+    return out
+
+
 def resize_row(row: np.ndarray, original_width: int = 200, new_width: int = 150) -> np.ndarray:
     """
     Resize a single row of pixel data using linear interpolation.
@@ -35,16 +156,10 @@ def resize_row(row: np.ndarray, original_width: int = 200, new_width: int = 150)
         new_width: Target number of pixels
         
     Returns:
-        Resized array of pixel values
+        Resized float32 array of pixel values
     """
-    # Create interpolation indices
-    old_indices = np.linspace(0, original_width - 1, original_width)
-    new_indices = np.linspace(0, original_width - 1, new_width)
-    
-    # Perform linear interpolation
-    resized = np.interp(new_indices, old_indices, row)
-    
-    return resized
+    # Run the row through the batched path as a one-row block
+    return resize_rows(np.asarray(row)[None, :], original_width, new_width)[0]
 
 
 def resize_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -57,29 +172,21 @@ def resize_data(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with depth and 150 resized pixel columns
     """
-    # Extract pixel columns (assuming they are named col1 to col200)
-    pixel_cols = [f'col{i}' for i in range(1, 201)]
-    
-    # Verify all pixel columns exist
-    missing_cols = [col for col in pixel_cols if col not in df.columns]
+    # Verify all pixel columns (col1 to col200) exist
+    missing_cols = find_missing_pixel_columns(df.columns)
     if missing_cols:
         raise ValueError(f"Missing pixel columns: {missing_cols[:5]}...")
     
-    # Resize each row
-    resized_data = []
-    for idx, row in df.iterrows():
-        pixel_values = np.array(row[pixel_cols], dtype=float)
-        resized_row = resize_row(pixel_values)
-        resized_data.append(resized_row)
-    
-    # Convert to numpy array for efficient storage
-    resized_array = np.array(resized_data)
+    # Resize every row at once
+    resized_array = resize_rows(df[PIXEL_COLUMNS].to_numpy(dtype=np.float32))
     
     # Create new dataframe with all columns at once to avoid fragmentation
-    resized_dict = {'depth': df['depth'].values}
-    for i in range(150):
-        resized_dict[f'pixel_{i}'] = resized_array[:, i]
+    resized_df = pd.DataFrame(resized_array, columns=RESIZED_COLUMNS)
+    resized_df.insert(0, 'depth', df['depth'].values)
     
-    resized_df = pd.DataFrame(resized_dict)
-    
-    return resized_df 
\ No newline at end of file
+    return resized_df
+
+
+# Build the default 200 -> 150 weights up front so the first resize (and the
+# numba JIT compile) is not paid during processing
+resize_rows(np.zeros((1, 200), dtype=np.float32))
\ No newline at end of file
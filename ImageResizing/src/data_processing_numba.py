@@ -0,0 +1,30 @@
+"""
+Numba kernels for data processing.
+
+numba is optional: when it is not installed NUMBA_AVAILABLE is False and callers
+fall back to their NumPy implementations.
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def resize_block(pixels, lower, upper, weights, out):
+        """
+        Linearly interpolate each row of pixels into out, in parallel over rows.
+        
+        Args:
+            pixels: Contiguous float32 array of shape (rows, original_width)
+            lower: Left source index for each output pixel
+            upper: Right source index for each output pixel
+            weights: Float32 weight of the right source pixel for each output pixel
+            out: Float32 array of shape (rows, new_width) to fill
+        """
+        for r in prange(pixels.shape[0]):
+            for j in range(lower.shape[0]):
+                out[r, j] = pixels[r, lower[j]] * (1 - weights[j]) + pixels[r, upper[j]] * weights[j]
\ No newline at end of file
@@ -2,22 +2,41 @@
 Database module for MongoDB interactions.
 """
 import json
+import time
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient, errors, ReplaceOne
+from bson import Binary
+from pymongo import MongoClient, errors, ReplaceOne, WriteConcern
 from pymongo.collection import Collection
 from pymongo.database import Database
 from typing import List, Dict, Optional, Any
 import logging
-from config import MONGODB_URI, DATABASE_NAME, COLLECTION_NAME
+from config import (
+    MONGODB_URI, DATABASE_NAME, COLLECTION_NAME, MONGO_BATCH_SIZE,
+    MONGO_COMPRESSORS, MONGO_MIN_POOL_SIZE, MAX_CONCURRENT_REQUESTS
+)
+from src.utils import RESIZED_COLUMNS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keep each bulk write comfortably under the 16 MB BSON document limit
+MAX_BATCH_BYTES = 15 * 1024 * 1024
+
+# Pixel rows are stored as raw little-endian float32 bytes
+PIXEL_DTYPE = np.dtype('<f4')
+
+# Unique index on depth, used for range queries and upserts
+DEPTH_INDEX = [("depth", 1)]
+DEPTH_INDEX_NAME = "depth_1"
+
 # Global MongoDB client
 _client: Optional[MongoClient] = None
 _database: Optional[Database] = None
 _collection: Optional[Collection] = None
+# Whether the depth index exists; None until checked on this connection
+_depth_index_exists: Optional[bool] = None
 
 
 def get_client() -> MongoClient:
@@ -25,7 +44,14 @@ def get_client() -> MongoClient:
     global _client
     if _client is None:
         try:
-            _client = MongoClient(MONGODB_URI)
+            # Size the pool for the API's concurrent requests and compress traffic
+            _client = MongoClient(
+                MONGODB_URI,
+                maxPoolSize=MAX_CONCURRENT_REQUESTS * 2,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                compressors=MONGO_COMPRESSORS,
+                retryWrites=True
+            )
             # Test the connection
             _client.admin.command('ping')
             logger.info("Successfully connected to MongoDB")
@@ -45,16 +71,48 @@ def get_database() -> Database:
 
 
 def get_collection() -> Collection:
-    """Get the collection instance."""
+    """
+    Get the cached collection instance.
+    
+    Indexes are created by ensure_indexes, so this never round-trips to the
+    server once the client is connected.
+    """
     global _collection
     if _collection is None:
         database = get_database()
         _collection = database[COLLECTION_NAME]
-        # Create index on depth for better query performance
-        _collection.create_index("depth", unique=True)
     return _collection
 
 
+def ensure_indexes():
+    """
+    Create the unique depth index if it does not exist yet.
+    
+    query_data hints this index when it exists. create_index is a no-op when
+    the index is already there.
+    """
+    global _depth_index_exists
+    get_collection().create_index(DEPTH_INDEX, unique=True)
+    _depth_index_exists = True
+
+
+def _has_depth_index(collection: Collection) -> bool:
+    """
+    Check whether the depth index exists, once per connection.
+    
+    Listing indexes only needs read access, unlike create_index. If the check
+    fails the index is treated as missing, so queries run without a hint.
+    """
+    global _depth_index_exists
+    if _depth_index_exists is None:
+        try:
+            _depth_index_exists = DEPTH_INDEX_NAME in collection.index_information()
+        except errors.PyMongoError as e:
+            logger.warning(f"Could not list indexes, querying without an index hint: {e}")
+            _depth_index_exists = False
+    return _depth_index_exists
+
+
 def init_db(force_recreate=False):
     """Initialize database collections."""
     try:
@@ -64,11 +122,9 @@ def init_db(force_recreate=False):
             logger.info("Force recreating database collection...")
             collection.drop()
             logger.info("Dropped existing collection")
-            # Recreate the collection and index
-            collection = get_collection()
         
-        # Ensure index exists
-        collection.create_index("depth", unique=True)
+        # Create index on depth for range queries and upserts
+        ensure_indexes()
         
         # Verify connection and get collection stats
         stats = collection.database.command("collstats", COLLECTION_NAME)
@@ -79,48 +135,58 @@ def init_db(force_recreate=False):
         raise
 
 
-def insert_data(df: pd.DataFrame):
+def insert_data(df: pd.DataFrame, fast_insert: bool = True):
     """
     Insert resized data into MongoDB.
     This will insert new records or update existing ones if a depth value already exists.
     
     Args:
         df: DataFrame with depth and 150 pixel columns
+        fast_insert: Use unordered, unacknowledged (w=0) writes for throughput.
+            Set to False to wait for the server to acknowledge each batch.
     """
     collection = get_collection()
+    if fast_insert:
+        collection = collection.with_options(write_concern=WriteConcern(w=0))
     
     try:
-        pixel_cols = [f'pixel_{i}' for i in range(150)]
-        
-        # Prepare documents for bulk operation
-        operations = []
+        # Extract columns as whole arrays instead of per-row lookups
+        depths = df['depth'].to_numpy(dtype=float).tolist()
+        pixels = df[RESIZED_COLUMNS].to_numpy(dtype=PIXEL_DTYPE)
         
-        for _, row in df.iterrows():
-            depth = float(row['depth'])
-            pixel_data = [float(row[col]) for col in pixel_cols]
-            
-            # Use upsert operation (update if exists, insert if not)
-            operations.append(ReplaceOne(
+        # Use upsert operations (update if exists, insert if not)
+        operations = [
+            ReplaceOne(
                 {"depth": depth},
                 {
                     "depth": depth,
-                    "data": pixel_data
+                    "data": Binary(pixel_data.tobytes())
                 },
                 upsert=True
-            ))
+            )
+            for depth, pixel_data in zip(depths, pixels)
+        ]
         
         # Execute bulk operations in batches for better performance
-        batch_size = 1000
+        approx_doc_bytes = PIXEL_DTYPE.itemsize * len(RESIZED_COLUMNS) + 64
+        batch_size = max(1, min(MONGO_BATCH_SIZE, MAX_BATCH_BYTES // approx_doc_bytes))
         inserted_count = 0
         updated_count = 0
         
         for i in range(0, len(operations), batch_size):
             batch = operations[i:i + batch_size]
-            result = collection.bulk_write(batch)
-            inserted_count += result.upserted_count
-            updated_count += result.modified_count
+            start = time.perf_counter()
+            # Operations are independent upserts, so let the server apply them in any order
+            result = collection.bulk_write(batch, ordered=False)
+            logger.debug(f"Wrote batch of {len(batch)} operations in {time.perf_counter() - start:.3f}s")
+            if result.acknowledged:
+                inserted_count += result.upserted_count
+                updated_count += result.modified_count
         
-        logger.info(f"Successfully processed {len(df)} records: {inserted_count} inserted, {updated_count} updated")
+        if fast_insert:
+            logger.info(f"Submitted {len(df)} records (unacknowledged writes)")
+        else:
+            logger.info(f"Successfully processed {len(df)} records: {inserted_count} inserted, {updated_count} updated")
         
     except Exception as e:
         logger.error(f"Error during bulk insert/update: {e}")
@@ -136,28 +202,34 @@ def query_data(depth_min: float, depth_max: float) -> List[Dict[str, Any]]:
         depth_max: Maximum depth value
         
     Returns:
-        List of dictionaries with depth and data fields
+        List of dictionaries with depth and data (float32 pixel array) fields
     """
     collection = get_collection()
     
     try:
-        # Query documents within the depth range
+        # Query documents within the depth range, fetching only the fields we return
         cursor = collection.find(
             {
                 "depth": {
                     "$gte": depth_min,
                     "$lte": depth_max
                 }
-            }
-        ).sort("depth", 1)  # Sort by depth ascending
+            },
+            projection={"_id": 0, "depth": 1, "data": 1},
+            batch_size=1000
+        ).sort("depth", 1)
+        # Rows must come back in depth order. Hinting the depth index makes the
+        # index scan provide that order, so the sort never becomes an in-memory
+        # stage. Without the index the hint would fail the query, so skip it.
+        if _has_depth_index(collection):
+            cursor = cursor.hint(DEPTH_INDEX)
         
-        # Convert to list of dictionaries
-        data = []
-        for document in cursor:
-            data.append({
-                'depth': document['depth'],
-                'data': document['data']
-            })
+        # Projected documents already have the record shape; decode the pixel bytes.
+        # Documents written before binary storage hold a plain array and are left as is.
+        data = list(cursor)
+        for document in data:
+            if isinstance(document['data'], bytes):
+                document['data'] = np.frombuffer(document['data'], dtype=PIXEL_DTYPE)
         
         logger.info(f"Retrieved {len(data)} records for depth range [{depth_min}, {depth_max}]")
         return data
@@ -181,10 +253,11 @@ def clear_database():
 
 def close_connection():
     """Close the MongoDB connection."""
-    global _client, _database, _collection
+    global _client, _database, _collection, _depth_index_exists
     if _client:
         _client.close()
         _client = None
         _database = None
         _collection = None
+        _depth_index_exists = None
         logger.info("MongoDB connection closed") 
\ No newline at end of file
@@ -1,11 +1,53 @@
 """
 Image generation module for creating PNG images with color mapping.
 """
+from io import BytesIO
 import numpy as np
 from PIL import Image
-from typing import List, Dict, Tuple, Any
-import matplotlib.cm as cm
+from typing import List, Dict, Optional, Tuple, Any
+import matplotlib
 from config import COLORMAPS, DEFAULT_COLORMAP
+from src.image_generation_numba import NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+    from src.image_generation_numba import render_rgb, scale_to_uint8
+
+
+def _build_colormap_lut(cm_name: str) -> np.ndarray:
+    """Build a 256-entry RGB lookup table for a colormap."""
+    if cm_name == 'grayscale':
+        # Repeat each intensity across the RGB channels
+        return np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+    cmap = matplotlib.colormaps[cm_name]
+    return (cmap(np.arange(256) / 255.0)[:, :3] * 255).astype(np.uint8)
+
+
+# RGB lookup tables for every colormap, indexed by 0-255 intensity
+COLORMAP_LUTS = {
+    name: _build_colormap_lut(cm_name)
+    for name, cm_name in COLORMAPS.items()
+}
+
+
+def _normalization_scale(data: np.ndarray) -> Tuple[Any, Optional[float]]:
+    """
+    Get the shift and scale that map data onto 0-255.
+    
+    The float64 scale is nudged up one ulp so truncation still maps the maximum
+    exactly to 255.
+    
+    Args:
+        data: Input data array
+        
+    Returns:
+        Tuple of (data_min, scale); scale is None for constant data
+    """
+    # Reduce once for each bound
+    data_min = data.min()
+    data_range = data.max() - data_min
+    if data_range == 0:
+        return data_min, None
+    return data_min, np.nextafter(255.0 / float(data_range), np.inf)
 
 
 def normalize_data(data: np.ndarray) -> np.ndarray:
@@ -18,13 +60,25 @@ def normalize_data(data: np.ndarray) -> np.ndarray:
     Returns:
         Normalized data in range 0-255
     """
+    data_min, scale = _normalization_scale(data)
+    
     # Handle edge case of constant data
-    if data.min() == data.max():
-        return np.full_like(data, 127, dtype=np.uint8)
+    if scale is None:
+        return np.full(data.shape, 127, dtype=np.uint8)
     
-    # Normalize to 0-255 range
-    normalized = (data - data.min()) / (data.max() - data.min()) * 255
-    return normalized.astype(np.uint8)
+    # Normalize to 0-255 range: shift in float32 (float64 for wider input), then
+    # scale straight into the uint8 result so no separate cast pass is needed
+    shift_dtype = np.result_type(data.dtype, np.float32)
+    if NUMBA_AVAILABLE:
+        # One fused, clamped elementwise pass with no shifted temporary
+        return scale_to_uint8(
+            data.astype(shift_dtype, copy=False), shift_dtype.type(data_min), scale
+        )
+    
+    shifted = np.subtract(data, data_min, dtype=shift_dtype)
+    normalized = np.empty(data.shape, dtype=np.uint8)
+    np.multiply(shifted, scale, out=normalized, dtype=np.float64, casting='unsafe')
+    return normalized
 
 
 def apply_colormap(data: np.ndarray, colormap: str = 'grayscale') -> np.ndarray:
@@ -32,66 +86,97 @@ def apply_colormap(data: np.ndarray, colormap: str = 'grayscale') -> np.ndarray:
     Apply a color map to grayscale data.
     
     Args:
-        data: 2D array of grayscale values (0-255)
+        data: 2D uint8 array of grayscale values (0-255)
         colormap: Name of the colormap to apply
         
     Returns:
         3D array with RGB values
     """
-    # Validate colormap
-    if colormap not in COLORMAPS:
-        colormap = DEFAULT_COLORMAP
-    
-    # Get matplotlib colormap name
-    cm_name = COLORMAPS[colormap]
-    
-    if colormap == 'grayscale':
-        # For grayscale, just repeat values for RGB channels
-        rgb_data = np.stack([data, data, data], axis=-1)
-    else:
-        # Use matplotlib colormap
-        cmap = cm.get_cmap(cm_name)
-        # Normalize data to 0-1 for colormap
-        norm_data = data / 255.0
-        # Apply colormap (returns RGBA, we take RGB)
-        rgb_data = (cmap(norm_data)[:, :, :3] * 255).astype(np.uint8)
-    
-    return rgb_data
+    # Look up each intensity in the precomputed table: one gather to (H, W, 3)
+    return _get_colormap_lut(colormap)[data]
 
 
-def generate_image(data_records: List[Dict[str, Any]], colormap: str = 'grayscale') -> Image.Image:
+def _get_colormap_lut(colormap: str) -> np.ndarray:
+    """Get the lookup table for a colormap, falling back to the default for unknown names."""
+    return COLORMAP_LUTS.get(colormap, COLORMAP_LUTS[DEFAULT_COLORMAP])
+
+
+def render_frame(data_records: List[Dict[str, Any]], colormap: str = 'grayscale') -> np.ndarray:
     """
-    Generate a PNG image from database records.
+    Render database records into an RGB pixel array.
     
     Args:
         data_records: List of records with 'depth' and 'data' fields
         colormap: Color map to apply
         
     Returns:
-        PIL Image object
+        C-contiguous uint8 array of shape (records, pixels, 3)
     """
     if not data_records:
         raise ValueError("No data records provided")
     
-    # Extract pixel data
-    pixel_arrays = []
-    for record in data_records:
-        pixel_data = np.array(record['data'], dtype=float)
-        pixel_arrays.append(pixel_data)
+    # Copy pixel rows straight into one preallocated 2D array
+    image_data = np.empty((len(data_records), len(data_records[0]['data'])), dtype=np.float32)
+    for i, record in enumerate(data_records):
+        image_data[i] = record['data']
     
-    # Convert to 2D numpy array
-    image_data = np.array(pixel_arrays)
+    if NUMBA_AVAILABLE:
+        # Normalize and apply the colormap in one pass straight into the RGB buffer
+        lut = _get_colormap_lut(colormap)
+        data_min, scale = _normalization_scale(image_data)
+        rgb_data = np.empty(image_data.shape + (3,), dtype=np.uint8)
+        if scale is None:
+            # Constant data maps to the middle of the colormap, as in normalize_data
+            rgb_data[:] = lut[127]
+        else:
+            render_rgb(image_data, data_min, scale, lut, rgb_data)
+        return rgb_data
     
     # Normalize data
     normalized_data = normalize_data(image_data)
     
     # Apply colormap
-    rgb_data = apply_colormap(normalized_data, colormap)
+    return np.ascontiguousarray(apply_colormap(normalized_data, colormap))
+
+
+def encode_png(rgb_data: np.ndarray, compress_level: int = 1) -> bytes:
+    """
+    Encode an RGB pixel array as PNG bytes.
     
-    # Create PIL Image
-    image = Image.fromarray(rgb_data, mode='RGB')
+    Args:
+        rgb_data: C-contiguous uint8 array of shape (height, width, 3)
+        compress_level: zlib level from 0 (none) to 9 (smallest); the default
+            favours encode speed over size
+        
+    Returns:
+        PNG image as bytes
+    """
+    return get_image_bytes(_wrap_rgb(rgb_data), compress_level)
+
+
+def _wrap_rgb(rgb_data: np.ndarray) -> Image.Image:
+    """
+    Wrap a contiguous RGB buffer as a PIL Image.
     
-    return image
+    'RGB' is not a mode Pillow can map in place, so frombuffer copies the
+    buffer once into the image's own 32-bit pixel layout.
+    """
+    height, width = rgb_data.shape[:2]
+    return Image.frombuffer('RGB', (width, height), rgb_data, 'raw', 'RGB', 0, 1)
+
+
+def generate_image(data_records: List[Dict[str, Any]], colormap: str = 'grayscale') -> Image.Image:
+    """
+    Generate a PNG image from database records.
+    
+    Args:
+        data_records: List of records with 'depth' and 'data' fields
+        colormap: Color map to apply
+        
+    Returns:
+        PIL Image object
+    """
+    return _wrap_rgb(render_frame(data_records, colormap))
 
 
 def save_image(image: Image.Image, filename: str):
@@ -105,18 +190,18 @@ def save_image(image: Image.Image, filename: str):
     image.save(filename, 'PNG')
 
 
-def get_image_bytes(image: Image.Image) -> bytes:
+def get_image_bytes(image: Image.Image, compress_level: int = 1) -> bytes:
     """
     Convert PIL Image to bytes for API response.
     
     Args:
         image: PIL Image object
+        compress_level: zlib level from 0 (none) to 9 (smallest); the default
+            favours encode speed over size
         
     Returns:
         PNG image as bytes
     """
-    from io import BytesIO
     buffer = BytesIO()
-    image.save(buffer, format='PNG')
-    buffer.seek(0)
-    return buffer.getvalue() 
\ No newline at end of file
+    image.save(buffer, format='PNG', compress_level=compress_level, optimize=False)
+    return buffer.getvalue()
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Numba kernels for image generation.
+
+numba is optional: when it is not installed NUMBA_AVAILABLE is False and callers
+fall back to their NumPy implementations.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange, vectorize
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @vectorize(
+        ['uint8(float32, float32, float64)', 'uint8(float64, float64, float64)'],
+        nopython=True, cache=True
+    )
+    def scale_to_uint8(value, data_min, scale):
+        """
+        Shift and scale one value into the 0-255 range, clamped and truncated to uint8.
+        
+        The shift is done in the input precision and the scale in float64,
+        matching the NumPy path in normalize_data.
+        
+        Args:
+            value: Float32 or float64 input value
+            data_min: Minimum of the input data, in the same precision as value
+            scale: Float64 factor mapping the data range onto 0-255
+        """
+        scaled = np.float64(value - data_min) * scale
+        if scaled <= 0.0:
+            return 0
+        if scaled >= 255.0:
+            return 255
+        return np.uint8(scaled)
+    
+    @njit(
+        ['void(float32[:, ::1], float32, float64, uint8[:, ::1], uint8[:, :, ::1])'],
+        parallel=True, fastmath=True, cache=True
+    )
+    def render_rgb(data, data_min, scale, lut, out):
+        """
+        Normalize each value and look up its colour in one pass, in parallel over rows.
+        
+        Uses the same arithmetic as scale_to_uint8, so the result matches
+        normalize_data followed by apply_colormap.
+        
+        Args:
+            data: Contiguous float32 array of shape (rows, width)
+            data_min: Float32 minimum of data
+            scale: Float64 factor mapping the data range onto 0-255
+            lut: Contiguous uint8 lookup table of shape (256, 3)
+            out: Uint8 array of shape (rows, width, 3) to fill
+        """
+        for r in prange(data.shape[0]):
+            for c in range(data.shape[1]):
+                scaled = np.float64(data[r, c] - data_min) * scale
+                if scaled <= 0.0:
+                    index = 0
+                elif scaled >= 255.0:
+                    index = 255
+                else:
+                    index = np.int64(scaled)
+                out[r, c, 0] = lut[index, 0]
+                out[r, c, 1] = lut[index, 1]
+                out[r, c, 2] = lut[index, 2]
\ No newline at end of file
@@ -3,9 +3,14 @@ Utility functions for the image processing system.
 """
 import os
 import logging
-from typing import Callable, Dict
+from typing import Dict, List
 import numpy as np
 
+# Input pixel columns and resized output columns
+PIXEL_COLUMNS = [f'col{i}' for i in range(1, 201)]
+RESIZED_COLUMNS = [f'pixel_{i}' for i in range(150)]
+_PIXEL_COLUMN_SET = frozenset(PIXEL_COLUMNS)
+
 
 def setup_logging(level: str = "INFO"):
     """
@@ -31,23 +36,20 @@ def ensure_directory(path: str):
     os.makedirs(path, exist_ok=True)
 
 
-def get_colormap(colormap_name: str) -> Callable:
+def find_missing_pixel_columns(columns) -> List[str]:
     """
-    Get a color mapping function for the given colormap name.
+    Find which of the expected pixel columns are absent.
     
     Args:
-        colormap_name: Name of the colormap
+        columns: Column labels to check, e.g. df.columns
         
     Returns:
-        Function that maps grayscale values to RGB
+        Missing pixel column names in column order (empty if none are missing)
     """
-    if colormap_name == 'grayscale':
-        def grayscale_map(value: int) -> tuple:
-            return (value, value, value)
-        return grayscale_map
-    
-    # For other colormaps, we use matplotlib which is handled in image_generation.py
-    raise NotImplementedError(f"Colormap {colormap_name} should be handled by matplotlib")
+    missing = _PIXEL_COLUMN_SET.difference(columns)
+    if not missing:
+        return []
+    return [col for col in PIXEL_COLUMNS if col in missing]
 
 
 def validate_csv_structure(df) -> bool:
@@ -65,8 +67,7 @@ def validate_csv_structure(df) -> bool:
         raise ValueError("CSV must contain a 'depth' column")
     
     # Check for pixel columns
-    expected_cols = [f'col{i}' for i in range(1, 201)]
-    missing_cols = [col for col in expected_cols if col not in df.columns]
+    missing_cols = find_missing_pixel_columns(df.columns)
     
     if missing_cols:
         raise ValueError(f"Missing columns: {missing_cols[:5]}... (showing first 5)")
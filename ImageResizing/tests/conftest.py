@@ -0,0 +1,23 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from src.api import app
+
+# One 150-pixel row shared by every sample record
+_SAMPLE150 = tuple(range(150))
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client():
+    """Create one async test client shared by every test."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as async_client:
+        yield async_client
+
+
+@pytest.fixture(scope="session")
+def sample_records():
+    """Build depth records once for the whole test session."""
+    return [{'depth': depth, 'data': list(_SAMPLE150)} for depth in (100.0, 200.0, 300.0)]
\ No newline at end of file
@@ -2,121 +2,171 @@
 Integration tests for API endpoints.
 """
 import pytest
-from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
-from src.api import app
+import src.api
+from src.api import clear_image_cache
+from config import IMAGE_CACHE_MAX_AGE
 
+# Run every test on the session event loop shared with the client fixture
+pytestmark = pytest.mark.asyncio(loop_scope="session")
 
-@pytest.fixture
-def client():
-    """Create test client."""
-    return TestClient(app)
+
+@pytest.fixture(autouse=True)
+def empty_image_cache():
+    """Clear cached frames so each test sees its own mocks."""
+    clear_image_cache()
 
 
 class TestAPI:
     
-    def test_root_endpoint(self, client):
+    async def test_root_endpoint(self, client):
         """Test root endpoint."""
-        response = client.get("/")
+        response = await client.get("/")
         assert response.status_code == 200
         data = response.json()
         assert "message" in data
         assert "version" in data
     
-    def test_health_endpoint(self, client):
+    async def test_health_endpoint(self, client):
         """Test health check endpoint."""
-        response = client.get("/health")
+        response = await client.get("/health")
         assert response.status_code == 200
         assert response.json() == {"status": "healthy"}
     
     @patch('src.api.query_data')
-    @patch('src.api.generate_image')
-    @patch('src.api.get_image_bytes')
-    def test_image_frame_success(self, mock_get_bytes, mock_generate, mock_query, client):
+    @patch('src.api.render_frame')
+    @patch('src.api.encode_png')
+    async def test_image_frame_success(self, mock_encode, mock_render, mock_query, client, sample_records):
         """Test successful image frame generation."""
         # Mock database query
-        mock_query.return_value = [
-            {'depth': 100.0, 'data': list(range(150))},
-            {'depth': 200.0, 'data': list(range(150))}
-        ]
+        mock_query.return_value = sample_records[:2]
         
-        # Mock image generation
-        mock_image = MagicMock()
-        mock_generate.return_value = mock_image
+        # Mock frame rendering
+        mock_render.return_value = MagicMock()
         
-        # Mock image bytes
-        mock_get_bytes.return_value = b'fake_png_data'
+        # Mock PNG encoding
+        mock_encode.return_value = b'fake_png_data'
         
         # Make request
-        response = client.get("/image_frame?depth_min=100&depth_max=200")
+        response = await client.get("/image_frame?depth_min=100&depth_max=200")
         
         # Check response
         assert response.status_code == 200
         assert response.headers["content-type"] == "image/png"
+        assert response.headers["content-length"] == str(len(b'fake_png_data'))
         assert response.content == b'fake_png_data'
+        assert response.headers["cache-control"] == f"public, max-age={IMAGE_CACHE_MAX_AGE}"
     
-    def test_image_frame_invalid_range(self, client):
+    async def test_image_frame_invalid_range(self, client):
         """Test invalid depth range."""
-        response = client.get("/image_frame?depth_min=200&depth_max=100")
+        response = await client.get("/image_frame?depth_min=200&depth_max=100")
         assert response.status_code == 400
         assert response.json()["detail"] == "Invalid depth range"
     
-    def test_image_frame_missing_params(self, client):
+    async def test_image_frame_missing_params(self, client):
         """Test missing required parameters."""
-        response = client.get("/image_frame")
+        response = await client.get("/image_frame")
         assert response.status_code == 422  # Unprocessable Entity
     
     @patch('src.api.query_data')
-    def test_image_frame_no_data(self, mock_query, client):
+    async def test_image_frame_no_data(self, mock_query, client):
         """Test when no data exists in range."""
         # Mock empty query result
         mock_query.return_value = []
         
-        response = client.get("/image_frame?depth_min=100&depth_max=200")
+        response = await client.get("/image_frame?depth_min=100&depth_max=200")
         assert response.status_code == 404
         assert response.json()["detail"] == "No data in specified depth range"
     
     @patch('src.api.query_data')
-    def test_image_frame_single_depth(self, mock_query, client):
+    async def test_image_frame_single_depth(self, mock_query, client, sample_records):
         """Test single depth query."""
         # Mock single record
-        mock_query.return_value = [
-            {'depth': 100.0, 'data': list(range(150))}
-        ]
+        mock_query.return_value = sample_records[:1]
         
-        with patch('src.api.generate_image') as mock_generate:
-            with patch('src.api.get_image_bytes') as mock_get_bytes:
-                mock_get_bytes.return_value = b'single_depth_image'
+        with patch('src.api.render_frame') as mock_render:
+            with patch('src.api.encode_png') as mock_encode:
+                mock_encode.return_value = b'single_depth_image'
                 
-                response = client.get("/image_frame?depth_min=100&depth_max=100")
+                response = await client.get("/image_frame?depth_min=100&depth_max=100")
                 assert response.status_code == 200
     
-    def test_image_frame_colormap(self, client):
+    async def test_image_frame_colormap(self, client, sample_records):
         """Test colormap parameter."""
         with patch('src.api.query_data') as mock_query:
-            mock_query.return_value = [{'depth': 100.0, 'data': list(range(150))}]
+            mock_query.return_value = sample_records[:1]
             
-            with patch('src.api.generate_image') as mock_generate:
-                with patch('src.api.get_image_bytes') as mock_get_bytes:
-                    mock_get_bytes.return_value = b'colored_image'
+            with patch('src.api.render_frame') as mock_render:
+                with patch('src.api.encode_png') as mock_encode:
+                    mock_encode.return_value = b'colored_image'
                     
                     # Test valid colormap
-                    response = client.get("/image_frame?depth_min=100&depth_max=200&colormap=heatmap")
+                    response = await client.get("/image_frame?depth_min=100&depth_max=200&colormap=heatmap")
                     assert response.status_code == 200
                     
-                    # Verify colormap was passed to generate_image
-                    args, kwargs = mock_generate.call_args
+                    # Verify colormap was passed to render_frame
+                    args, kwargs = mock_render.call_args
                     # Check if colormap is passed as second positional argument or as keyword argument
                     assert (len(args) > 1 and args[1] == 'heatmap') or kwargs.get('colormap') == 'heatmap'
     
-    def test_image_frame_invalid_colormap(self, client):
+    async def test_image_frame_invalid_colormap(self, client):
         """Test invalid colormap parameter."""
-        response = client.get("/image_frame?depth_min=100&depth_max=200&colormap=invalid")
+        response = await client.get("/image_frame?depth_min=100&depth_max=200&colormap=invalid")
         assert response.status_code == 400
         assert "Invalid colormap" in response.json()["detail"]
     
-    def test_image_frame_out_of_bounds(self, client):
+    async def test_image_frame_out_of_bounds(self, client):
         """Test depth values out of bounds."""
-        response = client.get("/image_frame?depth_min=-2e6&depth_max=0")
+        response = await client.get("/image_frame?depth_min=-2e6&depth_max=0")
         assert response.status_code == 400
-        assert "Depth values must be between" in response.json()["detail"] 
\ No newline at end of file
+        assert "Depth values must be between" in response.json()["detail"] 
+    
+    @patch('src.api.query_data')
+    @patch('src.api.render_frame')
+    @patch('src.api.encode_png')
+    async def test_image_frame_cached(self, mock_encode, mock_render, mock_query, client, sample_records):
+        """Test repeated requests are served from the cache."""
+        mock_query.return_value = sample_records[:1]
+        mock_encode.return_value = b'cached_image'
+        
+        first = await client.get("/image_frame?depth_min=100&depth_max=200")
+        second = await client.get("/image_frame?depth_min=100&depth_max=200")
+        
+        assert first.content == second.content == b'cached_image'
+        assert mock_query.call_count == 1
+        
+        # A different colormap is a different frame
+        await client.get("/image_frame?depth_min=100&depth_max=200&colormap=heatmap")
+        assert mock_query.call_count == 2
+    
+    @patch('src.api.query_data')
+    @patch('src.api.render_frame')
+    @patch('src.api.encode_png')
+    async def test_image_frame_cache_expires(self, mock_encode, mock_render, mock_query, client, sample_records):
+        """Test cached frames are rendered again once they expire."""
+        mock_query.return_value = sample_records[:1]
+        mock_encode.return_value = b'cached_image'
+        
+        with patch('src.api.time.monotonic', return_value=1000.0):
+            await client.get("/image_frame?depth_min=100&depth_max=200")
+            await client.get("/image_frame?depth_min=100&depth_max=200")
+        assert mock_query.call_count == 1
+        
+        # Past the TTL the frame is queried and rendered again
+        with patch('src.api.time.monotonic', return_value=1000.0 + IMAGE_CACHE_MAX_AGE):
+            await client.get("/image_frame?depth_min=100&depth_max=200")
+        assert mock_query.call_count == 2
+    
+    @patch('src.api.query_data')
+    @patch('src.api.render_frame')
+    @patch('src.api.encode_png')
+    async def test_image_frame_cache_size(self, mock_encode, mock_render, mock_query, client, sample_records):
+        """Test the least recently used frame is evicted when the cache is full."""
+        mock_query.return_value = sample_records[:1]
+        mock_encode.return_value = b'cached_image'
+        
+        with patch.object(src.api, 'IMAGE_CACHE_SIZE', 1):
+            await client.get("/image_frame?depth_min=100&depth_max=200")
+            await client.get("/image_frame?depth_min=100&depth_max=300")
+            await client.get("/image_frame?depth_min=100&depth_max=200")
+        assert mock_query.call_count == 3
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Unit tests for database module against a mocked collection.
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch, MagicMock
+from bson import Binary
+from pymongo import ReplaceOne, WriteConcern
+from src.database import ensure_indexes, insert_data, query_data
+
+
+def make_resized_df(depths):
+    """Build a resized DataFrame with one distinct float32 pixel row per depth."""
+    pixels = np.arange(len(depths) * 150, dtype=np.float32).reshape(len(depths), 150) / 7
+    df = pd.DataFrame(pixels, columns=[f'pixel_{i}' for i in range(150)])
+    df.insert(0, 'depth', depths)
+    return df, pixels
+
+
+@pytest.fixture
+def mock_collection():
+    """Patch get_collection with a mocked collection."""
+    with patch('src.database.get_collection') as mock_get_collection:
+        collection = MagicMock()
+        mock_get_collection.return_value = collection
+        yield collection
+
+
+class TestDatabase:
+    
+    def test_ensure_indexes(self, mock_collection):
+        """Test that the unique depth index hinted by query_data is created."""
+        # Restore the module flag so later tests still see a fresh connection
+        with patch('src.database._depth_index_exists', None):
+            ensure_indexes()
+        
+        mock_collection.create_index.assert_called_once_with([("depth", 1)], unique=True)
+    
+    def test_insert_data_payload(self, mock_collection):
+        """Test that each row is upserted as float32 bytes keyed by depth."""
+        df, pixels = make_resized_df([100.0, 200.0])
+        
+        insert_data(df, fast_insert=False)
+        
+        # Safe inserts write through the collection's own write concern
+        mock_collection.with_options.assert_not_called()
+        mock_collection.bulk_write.assert_called_once()
+        
+        operations = mock_collection.bulk_write.call_args[0][0]
+        assert mock_collection.bulk_write.call_args[1] == {'ordered': False}
+        assert operations == [
+            ReplaceOne(
+                {"depth": depth},
+                {"depth": depth, "data": Binary(row.astype('<f4').tobytes())},
+                upsert=True
+            )
+            for depth, row in zip([100.0, 200.0], pixels)
+        ]
+    
+    def test_insert_data_fast_insert(self, mock_collection):
+        """Test that fast inserts use unacknowledged writes."""
+        df, _ = make_resized_df([100.0])
+        
+        insert_data(df)
+        
+        mock_collection.with_options.assert_called_once_with(write_concern=WriteConcern(w=0))
+        mock_collection.with_options.return_value.bulk_write.assert_called_once()
+        mock_collection.bulk_write.assert_not_called()
+    
+    def test_insert_data_batches(self, mock_collection):
+        """Test that operations are split into MONGO_BATCH_SIZE batches."""
+        df, _ = make_resized_df([float(depth) for depth in range(5)])
+        
+        with patch('src.database.MONGO_BATCH_SIZE', 2):
+            insert_data(df, fast_insert=False)
+        
+        batch_sizes = [len(call[0][0]) for call in mock_collection.bulk_write.call_args_list]
+        assert batch_sizes == [2, 2, 1]
+    
+    def test_query_data_decodes_binary(self, mock_collection):
+        """Test that stored bytes decode back to the original float32 rows."""
+        pixels = np.linspace(-1, 1, 150, dtype=np.float32)
+        legacy_row = list(range(150))
+        mock_collection.index_information.return_value = {'_id_': {}, 'depth_1': {}}
+        cursor = mock_collection.find.return_value.sort.return_value.hint.return_value
+        cursor.__iter__.return_value = iter([
+            {'depth': 100.0, 'data': Binary(pixels.astype('<f4').tobytes())},
+            {'depth': 200.0, 'data': legacy_row}
+        ])
+        
+        with patch('src.database._depth_index_exists', None):
+            records = query_data(100.0, 200.0)
+        
+        # The existing depth index is hinted; queries never create indexes
+        mock_collection.find.return_value.sort.return_value.hint.assert_called_once_with([("depth", 1)])
+        mock_collection.create_index.assert_not_called()
+        
+        assert [record['depth'] for record in records] == [100.0, 200.0]
+        assert records[0]['data'].dtype == np.float32
+        np.testing.assert_array_equal(records[0]['data'], pixels)
+        
+        # Documents stored before binary encoding pass through unchanged
+        assert records[1]['data'] is legacy_row
+    
+    def test_query_data_without_depth_index(self, mock_collection):
+        """Test that queries skip the hint when the depth index is missing."""
+        mock_collection.index_information.return_value = {'_id_': {}}
+        cursor = mock_collection.find.return_value.sort.return_value
+        cursor.__iter__.return_value = iter([{'depth': 100.0, 'data': list(range(150))}])
+        
+        with patch('src.database._depth_index_exists', None):
+            records = query_data(100.0, 200.0)
+            # The missing index is remembered instead of re-checked per query
+            query_data(100.0, 200.0)
+        
+        assert [record['depth'] for record in records] == [100.0]
+        cursor.hint.assert_not_called()
+        mock_collection.index_information.assert_called_once()
+        mock_collection.create_index.assert_not_called()
\ No newline at end of file
@@ -2,10 +2,12 @@
 Unit tests for image generation module.
 """
 import pytest
+from unittest.mock import patch
 import numpy as np
 from PIL import Image
 from src.image_generation import (
-    normalize_data, apply_colormap, generate_image, get_image_bytes
+    normalize_data, apply_colormap, generate_image, get_image_bytes,
+    render_frame, encode_png
 )
 
 
@@ -21,6 +23,34 @@ class TestImageGeneration:
         assert normalized.max() == 255
         assert normalized.dtype == np.uint8
     
+    def test_normalize_data_float64_offset(self):
+        """Test float64 data with a narrow range at a large offset."""
+        # The range is far below float32 resolution at this offset
+        data = 1e5 + np.linspace(0, 0.01, 300).reshape(2, 150)
+        normalized = normalize_data(data)
+        
+        assert normalized.min() == 0
+        assert normalized.max() == 255
+        assert np.all(np.diff(normalized.ravel().astype(int)) >= 0)
+    
+    def test_normalize_data_matches_numpy_path(self):
+        """Test the numba kernel and NumPy fallback give identical output."""
+        import src.image_generation as image_generation
+        
+        # Float32 pixel rows, and float64 data shifted in float64 by both paths
+        for data in (
+            np.random.rand(4, 150).astype(np.float32) * 1000,
+            1e5 + np.linspace(0, 0.01, 300).reshape(2, 150)
+        ):
+            normalized = normalize_data(data)
+            
+            with patch.object(image_generation, 'NUMBA_AVAILABLE', False):
+                fallback = normalize_data(data)
+            
+            np.testing.assert_array_equal(normalized, fallback)
+            assert normalized.min() == 0
+            assert normalized.max() == 255
+    
     def test_normalize_data_constant(self):
         """Test normalization with constant data."""
         data = np.ones((3, 4)) * 50
@@ -41,6 +71,19 @@ class TestImageGeneration:
         assert np.all(rgb[:, :, 0] == rgb[:, :, 1])
         assert np.all(rgb[:, :, 1] == rgb[:, :, 2])
     
+    def test_apply_colormap_heatmap(self):
+        """Test matplotlib colormap application via lookup table."""
+        data = np.array([[0, 128, 255], [64, 192, 255]], dtype=np.uint8)
+        rgb = apply_colormap(data, 'heatmap')
+        
+        assert rgb.shape == (2, 3, 3)
+        assert rgb.dtype == np.uint8
+        
+        # Should match applying the matplotlib colormap directly
+        import matplotlib
+        expected = (matplotlib.colormaps['hot'](data / 255.0)[:, :, :3] * 255).astype(np.uint8)
+        assert np.array_equal(rgb, expected)
+    
     def test_generate_image_basic(self):
         """Test basic image generation."""
         # Create test data records
@@ -58,6 +101,22 @@ class TestImageGeneration:
         assert image.mode == 'RGB'
         assert image.size == (150, 3)  # width=150, height=3
     
+    def test_generate_image_array_records(self):
+        """Test image generation from float32 array rows, as returned by query_data."""
+        data_records = [
+            {'depth': 100.0, 'data': np.arange(150, dtype=np.float32)},
+            {'depth': 200.0, 'data': np.arange(150, dtype=np.float32)[::-1].copy()}
+        ]
+        
+        image = generate_image(data_records)
+        
+        assert image.size == (150, 2)
+        
+        # Rows should be copied in order into the image
+        pixels = np.asarray(image)
+        assert pixels[0, 0, 0] == 0 and pixels[0, -1, 0] == 255
+        assert pixels[1, 0, 0] == 255 and pixels[1, -1, 0] == 0
+    
     def test_generate_image_empty_data(self):
         """Test error handling for empty data."""
         with pytest.raises(ValueError) as excinfo:
@@ -65,13 +124,9 @@ class TestImageGeneration:
         
         assert "No data records" in str(excinfo.value)
     
-    def test_generate_image_single_depth(self):
+    def test_generate_image_single_depth(self, sample_records):
         """Test image generation with single depth."""
-        data_records = [
-            {'depth': 100.0, 'data': list(range(150))}
-        ]
-        
-        image = generate_image(data_records)
+        image = generate_image(sample_records[:1])
         
         # Should create 1x150 image
         assert image.size == (150, 1)
@@ -94,6 +149,54 @@ class TestImageGeneration:
         loaded_image = Image.open(BytesIO(image_bytes))
         assert loaded_image.format == 'PNG'
     
+    def test_get_image_bytes_compress_level(self):
+        """Test that a higher compression level gives a smaller PNG."""
+        data = np.tile(np.arange(150, dtype=np.uint8), (50, 1))
+        image = Image.fromarray(np.stack([data, data, data], axis=-1))
+        
+        fast = get_image_bytes(image)
+        small = get_image_bytes(image, compress_level=9)
+        
+        assert len(small) <= len(fast)
+    
+    def test_render_frame_encode_png(self):
+        """Test rendering records to RGB and encoding them as PNG."""
+        data_records = [
+            {'depth': 100.0, 'data': tuple(range(150))},
+            {'depth': 200.0, 'data': tuple(range(150, 300))}
+        ]
+        
+        rgb_data = render_frame(data_records, 'viridis')
+        assert rgb_data.shape == (2, 150, 3)
+        assert rgb_data.dtype == np.uint8
+        
+        # Round-trip through PNG keeps every pixel
+        from io import BytesIO
+        loaded_image = Image.open(BytesIO(encode_png(rgb_data)))
+        assert loaded_image.format == 'PNG'
+        np.testing.assert_array_equal(np.asarray(loaded_image), rgb_data)
+    
+    def test_render_frame_matches_numpy_path(self):
+        """Test the fused numba render matches normalize_data plus apply_colormap."""
+        import src.image_generation as image_generation
+        
+        data_records = [
+            {'depth': float(i), 'data': np.random.rand(150).astype(np.float32) * 1000}
+            for i in range(4)
+        ]
+        
+        for colormap in ('grayscale', 'heatmap', 'viridis', 'plasma'):
+            rgb_data = render_frame(data_records, colormap)
+            
+            with patch.object(image_generation, 'NUMBA_AVAILABLE', False):
+                fallback = render_frame(data_records, colormap)
+            
+            np.testing.assert_array_equal(rgb_data, fallback)
+        
+        # Constant data maps to the middle of the colormap on both paths
+        constant = render_frame([{'depth': 0.0, 'data': [5.0] * 150}], 'viridis')
+        assert np.all(constant == apply_colormap(np.array([[127]], dtype=np.uint8), 'viridis')[0, 0])
+    
     def test_colormap_validation(self):
         """Test colormap validation and fallback."""
         data = np.array([[0, 128, 255]], dtype=np.uint8)